@@ -9,30 +9,641 @@ Excel批量加密解密工具
 import sys
 import os
 import csv
+import io
+import json
+import re
+import zipfile
+import shutil
+import tempfile
+import time
 import traceback
+import collections
+import concurrent.futures
+import multiprocessing
+import multiprocessing.util
 from datetime import datetime
-import pythoncom
-import win32com.client
-from PyQt5.QtWidgets import *
-from PyQt5.QtCore import *
-from PyQt5.QtGui import *
+import msoffcrypto
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QGroupBox, QVBoxLayout, QHBoxLayout,
+    QLabel, QLineEdit, QPushButton, QCheckBox, QRadioButton, QTableView,
+    QTextEdit, QProgressBar, QStatusBar, QFileDialog, QMessageBox, QInputDialog
+)
+from PyQt5.QtCore import (
+    Qt, QObject, QThread, QThreadPool, QRunnable, QTimer, QFileSystemWatcher,
+    QAbstractTableModel, QSortFilterProxyModel, QModelIndex, pyqtSignal
+)
+from PyQt5.QtGui import QColor, QIcon, QTextCursor, QTextBlockFormat, QTextCharFormat
+
+
+# 支持的Excel文件扩展名
+EXCEL_EXTENSIONS = ('.xlsx', '.xls', '.xlsm', '.xlsb')
+
+# msoffcrypto 可直接处理的格式（OOXML加密容器），其余格式回退到Excel
+MSOFFCRYPTO_EXTENSIONS = ('.xlsx', '.xlsm')
+
+# 文件头：OOXML(zip) 与 复合文档(CFB，.xls 或加密后的 .xlsx)
+ZIP_MAGIC = b'PK\x03\x04'
+CFB_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# 工作簿/工作表XML中的保护元素（修改密码、结构保护、工作表保护）
+PROTECTION_PATTERN = re.compile(
+    rb'<(?:\w+:)?(?:workbookProtection|sheetProtection|fileSharing)\b[^>]*/>'
+)
+# 修改密码元素（解密已加密的文件时只移除它，与Excel处理一致，不改动其他保护）
+WRITE_PASSWORD_PATTERN = re.compile(rb'<(?:\w+:)?fileSharing\b[^>]*/>')
+PROTECTED_PART_PATTERN = re.compile(r'^xl/(?:workbook\.xml|worksheets/[^/]+\.xml)$')
+
+# 文件读写缓冲区大小
+COPY_BUFFER_SIZE = 1 << 20
+
+# 状态更新批量发送的条数和时间间隔（秒）
+STATUS_BATCH_SIZE = 16
+STATUS_FLUSH_INTERVAL = 0.1
+
+# 导出日志时的写入缓冲区大小
+LOG_EXPORT_BUFFER_SIZE = 64 * 1024
+
+# 日志最多保留的条数和刷新间隔（毫秒）
+LOG_MAX_LINES = 5000
+LOG_FLUSH_INTERVAL_MS = 100
+
+# 单条日志的HTML模板：时间、带颜色的类型前缀、消息
+LOG_ENTRY_TEMPLATE = '<font color="#888888">{}</font> {} {}'
+
+# 网络文件夹扫描结果的缓存文件，以及最多缓存的文件夹个数
+SCAN_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.excel_tool_cache.json')
+SCAN_CACHE_MAX_FOLDERS = 20
+
+# 并行处理的最大进程数（每个进程一个Excel实例）
+MAX_WORKERS = 4
+
+# 不经过Excel直接处理的最大线程数（加解密运算在OpenSSL中释放GIL）
+MAX_DIRECT_WORKERS = os.cpu_count() or 1
+
+
+# 选中待处理的文件（需能传给工作进程，定义在模块级别）
+SelectedFile = collections.namedtuple('SelectedFile', ['filename', 'new_filename', 'password', 'notes'])
+
+
+def list_excel_files(folder_path):
+    """列出文件夹中的Excel文件（scandir自带文件类型信息，无需逐个stat）"""
+    with os.scandir(folder_path) as it:
+        excel_files = [entry.name for entry in it
+                       if not entry.name.startswith('~')
+                       and entry.name.lower().endswith(EXCEL_EXTENSIONS)
+                       and entry.is_file(follow_symlinks=False)]
+    excel_files.sort()
+    return excel_files
+
+
+def list_excel_files_cached(folder_path, use_cache=True):
+    """列出文件夹中的Excel文件，网络文件夹修改时间未变时直接使用上次的扫描结果
+    
+    本地文件夹直接扫描：列目录本身很快，而且FAT/exFAT的文件夹修改时间不可靠
+    """
+    folder_key = os.path.abspath(folder_path)
+    if not is_network_path(folder_key):
+        return list_excel_files(folder_path)
+    try:
+        mtime_ns = os.stat(folder_key).st_mtime_ns
+    except OSError:
+        return list_excel_files(folder_path)
+    
+    cache = load_scan_cache()
+    entry = cache.get(folder_key)
+    if (use_cache and isinstance(entry, dict) and entry.get('mtime_ns') == mtime_ns
+            and cached_files_exist(folder_key, entry.get('files', []))):
+        return list(entry['files'])
+    
+    # 先取修改时间再扫描，扫描期间文件夹有变化时下次会重新扫描
+    excel_files = list_excel_files(folder_path)
+    cache.pop(folder_key, None)
+    cache[folder_key] = {'mtime_ns': mtime_ns, 'files': excel_files}
+    
+    # 只保留最近扫描的若干个文件夹
+    while len(cache) > SCAN_CACHE_MAX_FOLDERS:
+        del cache[next(iter(cache))]
+    save_scan_cache(cache)
+    return excel_files
+
+
+def cached_files_exist(folder_path, files):
+    """抽查缓存中的首、中、尾几个文件是否仍然存在（每个只需一次stat，不必重新列目录）"""
+    if not files:
+        return True
+    samples = {files[0], files[len(files) // 2], files[-1]}
+    return all(os.path.isfile(os.path.join(folder_path, name)) for name in samples)
+
+
+def load_scan_cache():
+    """读取扫描结果缓存，文件不存在或损坏时返回空缓存"""
+    try:
+        with open(SCAN_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if isinstance(cache, dict):
+            return cache
+    except:
+        pass
+    return {}
+
+
+def save_scan_cache(cache):
+    """写入扫描结果缓存（先写临时文件再替换，避免留下半个文件）"""
+    temp_path = SCAN_CACHE_PATH + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temp_path, SCAN_CACHE_PATH)
+    except:
+        pass
+
+
+# ==================== 文件处理函数（在工作进程中运行） ====================
+
+# 工作进程内缓存的Excel实例（按需启动）和取消标志
+_worker_excel = None
+_worker_cancel_event = None
+
+
+def create_excel_app():
+    """创建完全静默的Excel实例"""
+    import win32com.client  # 只在真正需要Excel时加载
+    
+    excel = win32com.client.DispatchEx("Excel.Application")
+    excel.Visible = False
+    excel.DisplayAlerts = False
+    excel.AskToUpdateLinks = False
+    excel.AlertBeforeOverwriting = False
+    excel.AutomationSecurity = 1
+    excel.EnableEvents = False
+    excel.Interactive = False
+    excel.ScreenUpdating = False
+    return excel
+
+
+def _worker_init(cancel_event):
+    """工作进程初始化：独立的COM环境"""
+    import pythoncom
+    
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+    pythoncom.CoInitialize()
+    # 进程正常退出时关闭Excel
+    multiprocessing.util.Finalize(None, _worker_shutdown, exitpriority=16)
+
+
+def get_worker_excel():
+    """获取工作进程的Excel实例，首次需要时才启动，已失效时重新启动"""
+    global _worker_excel
+    if _worker_excel is not None:
+        try:
+            _worker_excel.Version
+        except:
+            # Excel已崩溃或被关闭，丢弃失效的实例
+            _worker_excel = None
+    if _worker_excel is None:
+        _worker_excel = create_excel_app()
+    return _worker_excel
+
+
+def _worker_shutdown():
+    """工作进程退出：关闭Excel"""
+    import pythoncom
+    
+    global _worker_excel
+    if _worker_excel is not None:
+        try:
+            _worker_excel.Quit()
+        except:
+            pass
+        _worker_excel = None
+    try:
+        pythoncom.CoUninitialize()
+    except:
+        pass
+
+
+def _process_one(task):
+    """处理单个文件，返回 (file_info, (是否成功, 状态, 备注))；已取消时返回None"""
+    file_info, input_path, output_path, is_encrypt = task
+    if _worker_cancel_event is not None and _worker_cancel_event.is_set():
+        return None
+    
+    try:
+        result = process_file(file_info, input_path, output_path, is_encrypt)
+    except Exception as e:
+        result = (False, f"错误: {str(e)[:50]}", "处理异常")
+    return file_info, result
+
+
+def disable_recalculation(wb):
+    """关闭各工作表的重算，避免SaveAs前对整本公式做一次全量计算
+    
+    只用不随文件保存的工作表设置；ForceFullCalculation 会写入输出文件，不能修改
+    """
+    for ws in wb.Worksheets:
+        try:
+            ws.EnableCalculation = False
+        except:
+            pass
+
+
+def is_network_path(path):
+    """是否为网络共享路径（UNC）"""
+    return path.startswith('\\\\') or path.startswith('//')
+
+
+def copy_file_buffered(src, dst):
+    """以大块缓冲复制文件"""
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        shutil.copyfileobj(fsrc, fdst, COPY_BUFFER_SIZE)
+
+
+def process_file(file_info, input_path, output_path, is_encrypt):
+    """处理单个文件，网络路径上的文件先复制到本地临时目录处理再移回
+    
+    input_path/output_path 为以路径分隔符结尾的文件夹路径，直接拼接文件名
+    """
+    filename = file_info.filename
+    input_filepath = input_path + filename
+    output_filepath = output_path + file_info.new_filename
+    
+    if not (is_network_path(input_path) or is_network_path(output_path)) \
+            or not os.path.exists(input_filepath):
+        return process_local_file(file_info, input_filepath, output_filepath, is_encrypt)
+    
+    tmpdir = tempfile.mkdtemp(prefix='excel_tool_')
+    try:
+        local_in = os.path.join(tmpdir, filename)
+        local_out = os.path.join(tmpdir, 'output', file_info.new_filename)
+        copy_file_buffered(input_filepath, local_in)
+        
+        result = process_local_file(file_info, local_in, local_out, is_encrypt)
+        if result[0]:
+            os.makedirs(output_path, exist_ok=True)
+            shutil.move(local_out, output_filepath)
+        return result
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def process_local_file(file_info, input_filepath, output_filepath, is_encrypt):
+    """按加密/解密模式处理单个文件"""
+    filename = file_info.filename
+    if is_encrypt:
+        return encrypt_file(filename, input_filepath, output_filepath,
+                            file_info.password, file_info.notes)
+    else:
+        return decrypt_file(filename, input_filepath, output_filepath,
+                            file_info.password, file_info.notes)
+
+
+class OutputTarget:
+    """输出文件的实际写入位置
+    
+    输出与输入是同一文件时，先写到同目录下新建的临时文件（保留扩展名，Excel按扩展名识别格式；
+    以 ~ 开头，扫描文件时会被忽略），成功后 commit() 原子替换；discard() 只删除这里创建的临时文件
+    """
+    
+    def __init__(self, input_filepath, output_filepath):
+        self.output_filepath = output_filepath
+        self.same_file = os.path.abspath(input_filepath) == os.path.abspath(output_filepath)
+        self.temp_filepath = None
+        if self.same_file:
+            fd, self.temp_filepath = tempfile.mkstemp(
+                suffix=os.path.splitext(output_filepath)[1],
+                prefix='~excel_tool_',
+                dir=os.path.dirname(os.path.abspath(output_filepath)))
+            os.close(fd)
+        self.path = self.temp_filepath or output_filepath
+    
+    def commit(self):
+        """用临时文件替换输出文件"""
+        if self.temp_filepath:
+            os.replace(self.temp_filepath, self.output_filepath)
+            self.temp_filepath = None
+    
+    def discard(self):
+        """删除未替换成功的临时文件"""
+        if self.temp_filepath:
+            remove_partial_output(self.temp_filepath)
+            self.temp_filepath = None
+
+
+def encrypt_file(filename, input_filepath, output_filepath, password, notes):
+    """加密文件"""
+    try:
+        if not password:
+            return (False, "未设置密码", "密码为空")
+        
+        if not os.path.exists(input_filepath):
+            return (False, "输入文件不存在", "文件路径错误")
+        
+        # 确保输出目录存在
+        output_dir = os.path.dirname(output_filepath)
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+        
+        target = OutputTarget(input_filepath, output_filepath)
+        wb = None
+        try:
+            # 打开原始工作簿
+            excel = get_worker_excel()
+            wb = excel.Workbooks.Open(input_filepath)
+            disable_recalculation(wb)
+            
+            # 设置密码
+            wb.Password = password
+            wb.WritePassword = password
+            
+            # 另存为新文件，关闭后再替换
+            wb.SaveAs(target.path)
+            wb.Close(SaveChanges=False)
+            wb = None
+            target.commit()
+            
+            # 验证保存成功
+            if os.path.exists(output_filepath):
+                return (True, "加密成功", notes)
+            else:
+                return (False, "保存失败", "文件未创建")
+        
+        except Exception as e:
+            error_msg = str(e)
+            if "password" in error_msg.lower() or "密码" in error_msg:
+                return (False, "密码设置错误", "密码设置失败")
+            else:
+                return (False, f"加密失败: {error_msg[:50]}", "加密异常")
+        
+        finally:
+            if wb:
+                try:
+                    wb.Close(SaveChanges=False)
+                except:
+                    pass
+            target.discard()
+    
+    except Exception as e:
+        error_msg = str(e)
+        return (False, f"加密失败: {error_msg[:50]}", "系统错误")
+
+
+def decrypt_file(filename, input_filepath, output_filepath, password, notes):
+    """解密文件 - 仅移除密码保护"""
+    try:
+        if not os.path.exists(input_filepath):
+            return (False, "输入文件不存在", "文件路径错误")
+        
+        # 确保输出目录存在
+        output_dir = os.path.dirname(output_filepath)
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+        
+        target = OutputTarget(input_filepath, output_filepath)
+        wb = None
+        try:
+            # 尝试使用密码打开文件
+            excel = get_worker_excel()
+            try:
+                if password:
+                    wb = excel.Workbooks.Open(input_filepath, False, True, None, password)
+                else:
+                    wb = excel.Workbooks.Open(input_filepath)
+            except Exception as open_error:
+                error_msg = str(open_error)
+                if "password" in error_msg.lower() or "密码" in error_msg:
+                    return (False, "密码错误或密码不匹配", "密码不正确")
+                else:
+                    return (False, f"无法打开文件: {error_msg[:50]}", "打开失败")
+            disable_recalculation(wb)
+            
+            # 移除密码（仅此操作，不修改其他保护）
+            try:
+                wb.Password = ""
+                wb.WritePassword = ""
+            except:
+                pass  # 如果本来就没有密码，继续执行
+            
+            # 保存到指定位置
+            try:
+                if not target.same_file:
+                    # 如果输出文件已存在，先删除
+                    if os.path.exists(output_filepath):
+                        try:
+                            os.remove(output_filepath)
+                        except:
+                            pass
+                
+                # 保存解密后的文件，关闭后再替换
+                wb.SaveAs(target.path)
+                wb.Close(SaveChanges=False)
+                wb = None
+                target.commit()
+                
+                # 验证保存成功
+                if os.path.exists(output_filepath):
+                    return (True, "解密成功", notes)
+                else:
+                    return (False, "保存失败", "文件未创建")
+            
+            except Exception as save_error:
+                error_msg = str(save_error)
+                return (False, f"保存失败: {error_msg}", "保存错误")
+        
+        finally:
+            if wb:
+                try:
+                    wb.Close(SaveChanges=False)
+                except:
+                    pass
+            target.discard()
+    
+    except Exception as e:
+        error_msg = str(e)
+        return (False, f"解密失败: {error_msg[:50]}", "系统错误")
+
+
+# ==================== 不经过Excel的处理（在处理线程中运行） ====================
+
+def process_file_direct(file_info, input_path, output_path, is_encrypt):
+    """直接处理 .xlsx/.xlsm 文件，返回None表示需要交给Excel处理
+    
+    input_path/output_path 为以路径分隔符结尾的文件夹路径，直接拼接文件名
+    """
+    filename = file_info.filename
+    if not filename.lower().endswith(MSOFFCRYPTO_EXTENSIONS):
+        return None
+    
+    input_filepath = input_path + filename
+    output_filepath = output_path + file_info.new_filename
+    password = file_info.password
+    notes = file_info.notes
+    
+    if is_encrypt and not password:
+        return (False, "未设置密码", "密码为空")
+    
+    if not os.path.exists(input_filepath):
+        return (False, "输入文件不存在", "文件路径错误")
+    
+    # 确保输出目录存在
+    os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
+    
+    # 按文件头分派：zip包走zip/加密写出，复合文档走msoffcrypto，无法识别的交给Excel
+    file_format = detect_file_format(input_filepath)
+    if file_format is None:
+        return None
+    
+    target = OutputTarget(input_filepath, output_filepath)
+    try:
+        if is_encrypt:
+            if file_format == 'ooxml':
+                # 未加密：直接写出加密容器
+                result = encrypt_file_direct(input_filepath, target.path, password, notes)
+            elif is_encrypted_with(input_filepath, password):
+                # 已经用相同密码加密过：直接复制
+                if not target.same_file:
+                    shutil.copyfile(input_filepath, output_filepath)
+                return (True, "加密成功", notes)
+            else:
+                result = None
+        elif file_format == 'ooxml':
+            # 未加密：在zip层面移除保护
+            result = strip_protection_fast(input_filepath, target.path, notes)
+        else:
+            # 已加密：直接解密文件流
+            result = decrypt_file_direct(input_filepath, target.path, password, notes)
+        
+        if result is not None and result[0]:
+            target.commit()
+        return result
+    finally:
+        target.discard()
+
+
+def detect_file_format(filepath):
+    """按文件头识别格式：'ooxml'（未加密的zip包）、'cfb'（复合文档）或None"""
+    with open(filepath, 'rb') as f:
+        header = f.read(8)
+    if header.startswith(ZIP_MAGIC):
+        return 'ooxml'
+    if header == CFB_MAGIC:
+        return 'cfb'
+    return None
+
+
+def encrypt_file_direct(input_filepath, output_filepath, password, notes):
+    """使用msoffcrypto直接加密（OOXML敏捷加密），返回None表示需要回退到Excel处理"""
+    try:
+        with open(input_filepath, 'rb') as f, open(output_filepath, 'wb') as out:
+            office_file = msoffcrypto.OfficeFile(f)
+            office_file.encrypt(password, out)
+    except Exception:
+        remove_partial_output(output_filepath)
+        return None
+    
+    # 验证保存成功
+    if os.path.exists(output_filepath):
+        return (True, "加密成功", notes)
+    else:
+        return (False, "保存失败", "文件未创建")
+
+
+def is_encrypted_with(filepath, password):
+    """判断文件是否已用指定密码加密（仅识别OOXML加密容器）"""
+    try:
+        with open(filepath, 'rb') as f:
+            office_file = msoffcrypto.OfficeFile(f)
+            if office_file.format != 'ooxml' or not office_file.is_encrypted():
+                return False
+            office_file.load_key(password=password, verify_password=True)
+            return True
+    except Exception:
+        return False
+
+
+def decrypt_file_direct(input_filepath, output_filepath, password, notes):
+    """使用msoffcrypto直接解密，返回None表示需要回退到Excel处理"""
+    with open(input_filepath, 'rb') as f:
+        try:
+            office_file = msoffcrypto.OfficeFile(f)
+            if office_file.format != 'ooxml' or not office_file.is_encrypted():
+                return None  # 非OOXML或未加密（可能仅有修改密码），交给Excel处理
+        except Exception:
+            return None
+        
+        # 空密码时msoffcrypto不会加载密钥，直接按密码错误处理
+        if not password:
+            return (False, "密码错误或密码不匹配", "密码不正确")
+        
+        try:
+            office_file.load_key(password=password, verify_password=True)
+            decrypted = io.BytesIO()
+            office_file.decrypt(decrypted)
+        except msoffcrypto.exceptions.InvalidKeyError:
+            return (False, "密码错误或密码不匹配", "密码不正确")
+        except Exception as e:
+            return (False, f"解密失败: {str(e)[:50]}", "解密异常")
+    
+    # 再移除修改密码，工作簿/工作表保护保持不变
+    decrypted.seek(0)
+    return strip_protection_fast(decrypted, output_filepath, notes, WRITE_PASSWORD_PATTERN)
+
+
+def strip_protection_fast(input_filepath, output_filepath, notes, pattern=PROTECTION_PATTERN):
+    """在zip层面移除工作簿中与 pattern 匹配的保护元素，返回None表示需要回退到Excel处理
+    
+    input_filepath 可以是文件路径，也可以是已解密内容的文件对象
+    """
+    try:
+        with zipfile.ZipFile(input_filepath, 'r') as zin, \
+                open(output_filepath, 'wb', buffering=COPY_BUFFER_SIZE) as out, \
+                zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                out_info.compress_type = zipfile.ZIP_DEFLATED
+                out_info.external_attr = info.external_attr
+                if PROTECTED_PART_PATTERN.match(info.filename):
+                    data = pattern.sub(b'', zin.read(info))
+                    zout.writestr(out_info, data)
+                else:
+                    with zin.open(info) as src, zout.open(out_info, 'w') as dst:
+                        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+    except Exception:
+        remove_partial_output(output_filepath)
+        return None
+    
+    return (True, "解密成功", notes)
+
+
+def remove_partial_output(output_filepath):
+    """删除处理失败时残留的输出文件"""
+    if os.path.exists(output_filepath):
+        try:
+            os.remove(output_filepath)
+        except:
+            pass
 
 
 class ProcessingThread(QThread):
-    """处理线程 - 负责实际的Excel文件处理"""
+    """处理线程 - 负责分发文件到线程池/工作进程并汇总结果"""
     
     progress_signal = pyqtSignal(int, int)
     log_signal = pyqtSignal(str, str)
-    file_status_signal = pyqtSignal(str, str, bool, str)
+    batch_status_signal = pyqtSignal(list)
     finished_signal = pyqtSignal(dict)
     
-    def __init__(self, input_path, output_path, file_list, is_encrypt, parent=None):
+    def __init__(self, input_path, output_path, file_list, is_encrypt, pool, cancel_event, parent=None):
         super().__init__(parent)
         self.input_path = os.path.abspath(input_path)
         self.output_path = os.path.abspath(output_path)
+        # 以分隔符结尾的文件夹路径，逐个文件直接拼接文件名
+        self.input_prefix = os.path.join(self.input_path, '')
+        self.output_prefix = os.path.join(self.output_path, '')
         self.file_list = file_list
         self.is_encrypt = is_encrypt
         self.is_cancelled = False
+        self.pool = pool
+        self.cancel_event = cancel_event
     
     def run(self):
         """线程运行"""
@@ -43,77 +654,88 @@ class ProcessingThread(QThread):
         }
         
         try:
-            pythoncom.CoInitialize()
-            
-            # 初始化Excel - 完全静默模式
-            excel = win32com.client.Dispatch("Excel.Application")
-            excel.Visible = False
-            excel.DisplayAlerts = False
-            excel.AskToUpdateLinks = False
-            excel.AlertBeforeOverwriting = False
-            excel.AutomationSecurity = 1
-            excel.EnableEvents = False
-            excel.Interactive = False
-            excel.ScreenUpdating = False
-            
             # 清理临时文件
             self.clean_temp_files()
             
             # 设置进度
-            self.progress_signal.emit(0, len(self.file_list))
+            total = len(self.file_list)
+            self.progress_signal.emit(0, total)
             
             success_count = 0
+            tasks = iter([(file_info, self.input_prefix, self.output_prefix, self.is_encrypt)
+                          for file_info in self.file_list])
+            
+            # 状态更新攒批发送，避免逐个文件跨线程发信号
+            pending_status = []
+            last_flush = time.monotonic()
+            progress_step = max(1, total // 100)
+            last_progress = 0
             
-            for i, file_info in enumerate(self.file_list):
-                if self.is_cancelled:
-                    self.log_signal.emit("处理已取消", "warning")
-                    break
+            # .xlsx/.xlsm 在线程池中直接处理，其余交给持有Excel实例的工作进程，结果按完成顺序返回
+            done = 0
+            # 只让有限个任务在途，wait() 的开销与在途任务数成正比
+            max_in_flight = MAX_DIRECT_WORKERS * 2
+            running = set()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_DIRECT_WORKERS) as executor:
+                while True:
+                    # 取消后不再提交新任务
+                    while not self.is_cancelled and len(running) < max_in_flight:
+                        task = next(tasks, None)
+                        if task is None:
+                            break
+                        running.add(executor.submit(self.process_task, task))
+                    if not running:
+                        break
                     
-                filename = file_info['filename']
-                new_filename = file_info['new_filename']
-                password = file_info['password']
-                notes = file_info['notes']
-                input_filepath = os.path.join(self.input_path, filename)
-                output_filepath = os.path.join(self.output_path, new_filename)
-                # print(file_info)
-                # print(self.input_path,self.output_path)
-                
-                # 更新进度
-                self.progress_signal.emit(i + 1, len(self.file_list))
-                
-                try:
-                    if self.is_encrypt:
-                        result = self.encrypt_file(excel, filename, input_filepath, output_filepath, password, notes)
-                    else:
-                        result = self.decrypt_file(excel, filename, input_filepath, output_filepath, password, notes)
+                    # 限时等待，即使没有新结果也能按时发送已攒下的状态
+                    finished, running = concurrent.futures.wait(
+                        running, timeout=STATUS_FLUSH_INTERVAL,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                    
+                    # 取消后撤掉还在排队的任务，只等待正在处理的文件
+                    if self.is_cancelled:
+                        for future in running:
+                            future.cancel()
+                    
+                    for future in finished:
+                        if future.cancelled():
+                            continue
+                        
+                        item = future.result()
+                        if item is None:  # 已取消，跳过
+                            continue
+                        
+                        file_info, result = item
+                        filename = file_info.filename
+                        done += 1
                         
-                    if result[0]:  # 成功
-                        success_count += 1
-                        self.file_status_signal.emit(filename, result[1], True, result[2])
-                        self.log_signal.emit(f"{filename}: {result[1]} → {new_filename}", "success")
-                    else:  # 失败
-                        self.file_status_signal.emit(filename, result[1], False, result[2])
-                        self.log_signal.emit(f"{filename}: {result[1]}", "error")
-                        results['failed_files'].append({
-                            'filename': filename,
-                            'error': result[1]
-                        })
+                        # 更新进度
+                        if done - last_progress >= progress_step:
+                            self.progress_signal.emit(done, total)
+                            last_progress = done
                         
-                except Exception as e:
-                    error_msg = str(e)
-                    self.file_status_signal.emit(filename, f"错误: {error_msg[:50]}", False, "处理异常")
-                    self.log_signal.emit(f"{filename}: 处理失败 - {error_msg}", "error")
-                    results['failed_files'].append({
-                        'filename': filename,
-                        'error': error_msg
-                    })
+                        if result[0]:  # 成功
+                            success_count += 1
+                            log_text = f"{filename}: {result[1]} → {file_info.new_filename}"
+                        else:  # 失败
+                            log_text = f"{filename}: {result[1]}"
+                            results['failed_files'].append({
+                                'filename': filename,
+                                'error': result[1]
+                            })
+                        pending_status.append((filename, result[1], result[0], result[2], log_text))
                     
-            # 关闭Excel
-            try:
-                excel.Quit()
-                del excel
-            except:
-                pass
+                    if pending_status and (len(pending_status) >= STATUS_BATCH_SIZE
+                                           or time.monotonic() - last_flush > STATUS_FLUSH_INTERVAL):
+                        self.batch_status_signal.emit(pending_status)
+                        pending_status = []
+                        last_flush = time.monotonic()
+            
+            if pending_status:
+                self.batch_status_signal.emit(pending_status)
+            
+            if self.is_cancelled:
+                self.log_signal.emit("处理已取消", "warning")
             
             # 更新结果
             results['success_count'] = success_count
@@ -124,136 +746,31 @@ class ProcessingThread(QThread):
         except Exception as e:
             self.log_signal.emit(f"线程错误: {str(e)}", "error")
             self.log_signal.emit(traceback.format_exc(), "error")
-        finally:
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass
     
-    def clean_temp_files(self):
-        """清理临时文件"""
-        for f in os.listdir(self.input_path):
-            if f.startswith('~$'):
-                try:
-                    os.remove(os.path.join(self.input_path, f))
-                except:
-                    pass
-    
-    def encrypt_file(self, excel, filename, input_filepath, output_filepath, password, notes):
-        """加密文件"""
+    def process_task(self, task):
+        """先尝试不经过Excel直接处理，不行再交给工作进程"""
+        if self.cancel_event.is_set():
+            return None
+        
+        file_info, input_path, output_path, is_encrypt = task
         try:
-            if not password:
-                return (False, "未设置密码", "密码为空")
-                
-            if not os.path.exists(input_filepath):
-                return (False, "输入文件不存在", "文件路径错误")
-            
-            # 确保输出目录存在
-            output_dir = os.path.dirname(output_filepath)
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-            
-            wb = None
-            try:
-                # 打开原始工作簿
-                wb = excel.Workbooks.Open(input_filepath)
-                
-                # 设置密码
-                wb.Password = password
-                wb.WritePassword = password
-                
-                # 另存为新文件
-                wb.SaveAs(output_filepath)
-                
-                # 验证保存成功
-                if os.path.exists(output_filepath):
-                    return (True, "加密成功", notes)
-                else:
-                    return (False, "保存失败", "文件未创建")
-                    
-            except Exception as e:
-                error_msg = str(e)
-                if "password" in error_msg.lower() or "密码" in error_msg:
-                    return (False, "密码设置错误", "密码设置失败")
-                else:
-                    return (False, f"加密失败: {error_msg[:50]}", "加密异常")
-                    
-            finally:
-                if wb:
-                    try:
-                        wb.Close(SaveChanges=False)
-                    except:
-                        pass
-                        
+            result = process_file_direct(file_info, input_path, output_path, is_encrypt)
         except Exception as e:
-            error_msg = str(e)
-            return (False, f"加密失败: {error_msg[:50]}", "系统错误")
+            result = (False, f"错误: {str(e)[:50]}", "处理异常")
+        if result is not None:
+            return file_info, result
+        
+        return self.pool.apply(_process_one, (task,))
     
-    def decrypt_file(self, excel, filename, input_filepath, output_filepath, password, notes):
-        """解密文件 - 仅移除密码保护"""
-        try:
-            if not os.path.exists(input_filepath):
-                return (False, "输入文件不存在", "文件路径错误")
-            
-            # 确保输出目录存在
-            output_dir = os.path.dirname(output_filepath)
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-            
-            wb = None
-            try:
-                # 尝试使用密码打开文件
-                try:
-                    if password:
-                        wb = excel.Workbooks.Open(input_filepath, False, True, None, password)
-                    else:
-                        wb = excel.Workbooks.Open(input_filepath)
-                except Exception as open_error:
-                    error_msg = str(open_error)
-                    if "password" in error_msg.lower() or "密码" in error_msg:
-                        return (False, "密码错误或密码不匹配", "密码不正确")
-                    else:
-                        return (False, f"无法打开文件: {error_msg[:50]}", "打开失败")
-                
-                # 移除密码（仅此操作，不修改其他保护）
-                try:
-                    wb.Password = ""
-                    wb.WritePassword = ""
-                except:
-                    pass  # 如果本来就没有密码，继续执行
-                
-                # 保存到指定位置
-                try:
-                    # 如果输出文件已存在，先删除
-                    if os.path.exists(output_filepath):
-                        try:
-                            os.remove(output_filepath)
-                        except:
-                            pass
-                    
-                    # 保存解密后的文件
-                    wb.SaveAs(output_filepath)
-                    
-                    # 验证保存成功
-                    if os.path.exists(output_filepath):
-                        return (True, "解密成功", notes)
-                    else:
-                        return (False, "保存失败", "文件未创建")
-                        
-                except Exception as save_error:
-                    error_msg = str(save_error)
-                    return (False, f"保存失败: {error_msg}", "保存错误")
-                    
-            finally:
-                if wb:
+    def clean_temp_files(self):
+        """清理临时文件"""
+        with os.scandir(self.input_path) as it:
+            for entry in it:
+                if entry.name.startswith('~$'):
                     try:
-                        wb.Close(SaveChanges=False)
+                        os.remove(entry.path)
                     except:
                         pass
-                        
-        except Exception as e:
-            error_msg = str(e)
-            return (False, f"解密失败: {error_msg[:50]}", "系统错误")
     
     def finished_processing(self, results):
         """处理完成"""
@@ -263,18 +780,286 @@ class ProcessingThread(QThread):
     def cancel(self):
         """取消处理"""
         self.is_cancelled = True
+        self.cancel_event.set()
+
+
+class LogExportSignals(QObject):
+    """导出日志任务的信号（QRunnable 本身不能发信号）"""
+    
+    finished_signal = pyqtSignal(str, str)
+
+
+class LogExportTask(QRunnable):
+    """导出日志任务 - 在线程池中把日志逐行写入文件"""
+    
+    def __init__(self, file_path, lines):
+        super().__init__()
+        self.file_path = file_path
+        self.lines = lines
+        self.signals = LogExportSignals()
+    
+    def run(self):
+        error = ""
+        try:
+            with open(self.file_path, 'w', encoding='utf-8', buffering=LOG_EXPORT_BUFFER_SIZE) as f:
+                for line in self.lines:
+                    f.write(line)
+                    f.write('\n')
+        except Exception as e:
+            error = str(e)
+        self.signals.finished_signal.emit(self.file_path, error)
+
+
+class FileTableModel(QAbstractTableModel):
+    """文件列表数据模型 - 每列数据存放在并行列表中，视图只读取可见行"""
+    
+    HEADERS = ["选择", "文件名", "状态", "密码", "备注", "新文件名"]
+    COL_SELECT, COL_FILENAME, COL_STATUS, COL_PASSWORD, COL_NOTES, COL_NEW_FILENAME = range(6)
+    
+    # 显示列对应的数据列表
+    COLUMN_FIELDS = {
+        COL_FILENAME: 'filenames',
+        COL_STATUS: 'statuses',
+        COL_PASSWORD: 'passwords',
+        COL_NOTES: 'notes',
+    }
+    
+    # 未处理的文件才允许编辑密码
+    STATUS_PENDING = "待处理"
+    
+    # 状态/备注的前景色（共享同一个QColor，不逐行构造）
+    COLOR_PENDING = QColor("gray")
+    COLOR_FROM_BOOK = QColor("blue")
+    COLOR_UNIFIED = QColor("green")
+    COLOR_MANUAL = QColor("orange")
+    COLOR_SUCCESS = QColor("#44aa44")
+    COLOR_FAILED = QColor("#ff4444")
+    
+    # 各列固定的单元格标志，绘制时不再逐次组合
+    FLAGS_DEFAULT = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+    FLAGS_SELECT = FLAGS_DEFAULT | Qt.ItemIsUserCheckable
+    FLAGS_EDITABLE = FLAGS_DEFAULT | Qt.ItemIsEditable
+    
+    # 每行数据对应的全部列表
+    ROW_FIELDS = ('filenames', 'stems', 'exts', 'selected', 'statuses', 'status_colors',
+                  'passwords', 'notes', 'note_colors')
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filenames = []
+        # 文件名拆分后的主名和扩展名，生成新文件名时直接拼接
+        self.stems = []
+        self.exts = []
+        self.selected = []
+        self.statuses = []
+        self.status_colors = []
+        self.passwords = []
+        self.notes = []
+        self.note_colors = []
+        # 新文件名不逐行保存，显示时按当前后缀拼接
+        self.suffix = ""
+        # 处理过程中整体禁止编辑
+        self.locked = False
+        # 密码列按行缓存的标志，行状态变化时失效
+        self.flag_cache = {}
+        # 文件名到行号的索引，按文件名更新状态时不再逐行查找
+        self.row_by_filename = {}
+    
+    def default_columns(self, filenames):
+        """新文件各列的初始数据"""
+        count = len(filenames)
+        stems, exts = zip(*map(os.path.splitext, filenames)) if count else ((), ())
+        return {
+            'filenames': list(filenames),
+            'stems': list(stems),
+            'exts': list(exts),
+            'selected': [True] * count,
+            'statuses': [self.STATUS_PENDING] * count,
+            'status_colors': [self.COLOR_PENDING] * count,
+            'passwords': [""] * count,
+            'notes': [""] * count,
+            'note_colors': [None] * count,
+        }
+    
+    def set_files(self, filenames):
+        """重置文件列表"""
+        self.beginResetModel()
+        for field, values in self.default_columns(filenames).items():
+            setattr(self, field, values)
+        self.flag_cache.clear()
+        self.row_by_filename = {filename: row for row, filename in enumerate(self.filenames)}
+        self.endResetModel()
+    
+    def append_files(self, filenames):
+        """在末尾追加文件"""
+        if not filenames:
+            return
+        
+        first = len(self.filenames)
+        self.beginInsertRows(QModelIndex(), first, first + len(filenames) - 1)
+        for field, values in self.default_columns(filenames).items():
+            getattr(self, field).extend(values)
+        self.row_by_filename.update((filename, row) for row, filename in enumerate(filenames, first))
+        self.endInsertRows()
+    
+    def remove_files(self, filenames):
+        """移除指定文件所在的行"""
+        rows = [row for row, filename in enumerate(self.filenames) if filename in filenames]
+        
+        # 相邻的行合并成一段，每段只通知视图一次
+        runs = []
+        for row in rows:
+            if runs and runs[-1][1] == row - 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+        
+        for first, last in reversed(runs):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for field in self.ROW_FIELDS:
+                del getattr(self, field)[first:last + 1]
+            self.endRemoveRows()
+        if rows:
+            # 行号已移动，缓存和索引整体重建
+            self.flag_cache.clear()
+            self.row_by_filename = {filename: row for row, filename in enumerate(self.filenames)}
+    
+    def columns_changed(self, first, last=None, roles=()):
+        """通知视图若干列的数据已整体更新（roles 为空表示全部角色）"""
+        if not self.filenames:
+            return
+        if last is None:
+            last = first
+        self.dataChanged.emit(self.index(0, first), self.index(len(self.filenames) - 1, last), list(roles))
+    
+    def set_all_selected(self, checked):
+        """全部选中/取消选中"""
+        # 已经全部是目标状态时不必通知视图
+        if (not checked) not in self.selected:
+            return
+        self.selected = [checked] * len(self.filenames)
+        self.columns_changed(self.COL_SELECT, roles=[Qt.CheckStateRole])
+    
+    def set_locked(self, locked):
+        """锁定/解锁密码列编辑，只通知视图密码列更新一次"""
+        if locked == self.locked:
+            return
+        self.locked = locked
+        self.columns_changed(self.COL_PASSWORD)
+    
+    def set_suffix(self, suffix):
+        """设置新文件名后缀，只通知视图新文件名列更新一次"""
+        if suffix == self.suffix:
+            return
+        self.suffix = suffix
+        self.columns_changed(self.COL_NEW_FILENAME, roles=[Qt.DisplayRole])
+    
+    def new_filename(self, row):
+        """按当前后缀生成某一行的新文件名"""
+        if not self.suffix:
+            return self.filenames[row]
+        return self.stems[row] + self.suffix + self.exts[row]
+    
+    def row_changed(self, row):
+        """通知视图某一行的数据已更新"""
+        self.flag_cache.pop(row, None)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.filenames)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return section + 1
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        row, col = index.row(), index.column()
+        if col == self.COL_SELECT:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.selected[row] else Qt.Unchecked
+            return None
+        
+        if col == self.COL_NEW_FILENAME:
+            return self.new_filename(row) if role == Qt.DisplayRole else None
+        
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return getattr(self, self.COLUMN_FIELDS[col])[row]
+        if role == Qt.ForegroundRole:
+            if col == self.COL_STATUS:
+                return self.status_colors[row]
+            if col == self.COL_NOTES:
+                return self.note_colors[row]
+        return None
+    
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        
+        row, col = index.row(), index.column()
+        if col == self.COL_SELECT and role == Qt.CheckStateRole:
+            self.selected[row] = (value == Qt.Checked)
+        elif col == self.COL_PASSWORD and role == Qt.EditRole:
+            self.passwords[row] = str(value)
+        else:
+            return False
+        
+        self.dataChanged.emit(index, index, [role])
+        return True
+    
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        
+        col = index.column()
+        if col == self.COL_SELECT:
+            return self.FLAGS_SELECT
+        if col != self.COL_PASSWORD or self.locked:
+            return self.FLAGS_DEFAULT
+        
+        row = index.row()
+        flags = self.flag_cache.get(row)
+        if flags is None:
+            if self.statuses[row] == self.STATUS_PENDING:
+                flags = self.FLAGS_EDITABLE
+            else:
+                flags = self.FLAGS_DEFAULT
+            self.flag_cache[row] = flags
+        return flags
 
 
 class ExcelProtectorGUI(QMainWindow):
     """主界面类 - 负责用户交互"""
     
+    # 各类日志预先拼好的带颜色前缀
+    LOG_PREFIXES = {
+        "error": '<font color="#ff4444">[错误]</font>',
+        "warning": '<font color="#ff9900">[警告]</font>',
+        "success": '<font color="#44aa44">[成功]</font>',
+        "info": '<font color="#666666">[信息]</font>',
+    }
+    
     def __init__(self):
         super().__init__()
-        self.excel_app = None
+        self.worker_pool = None
+        self.cancel_event = None
         self.process_thread = None
         self.is_cancelled = False
         self.is_processing = False
         self.password_dict = {}
+        self.password_index = {}
+        self.password_stem_index = {}
+        self.scanned_folder = None
+        self.rescan_pending = False
+        self.log_export_task = None
         self.init_ui()
     
     def init_ui(self):
@@ -350,6 +1135,13 @@ class ExcelProtectorGUI(QMainWindow):
         self.suffix_edit.setPlaceholderText("为空则不添加后缀")
         suffix_layout.addWidget(self.suffix_edit)
         
+        # 输入后缀时合并连续按键，停顿后再刷新新文件名
+        self.suffix_timer = QTimer(self)
+        self.suffix_timer.setSingleShot(True)
+        self.suffix_timer.setInterval(150)
+        self.suffix_timer.timeout.connect(self.preview_new_filenames)
+        self.suffix_edit.textChanged.connect(lambda text: self.suffix_timer.start())
+        
         suffix_layout.addWidget(QLabel("示例:"))
         self.suffix_example = QLabel("原文件.xlsx → 原文件_加密.xlsx")
         self.suffix_example.setStyleSheet("color: #666; font-style: italic;")
@@ -418,9 +1210,28 @@ class ExcelProtectorGUI(QMainWindow):
         files_group = QGroupBox("文件列表")
         files_layout = QVBoxLayout()
         
-        self.files_table = QTableWidget()
-        self.files_table.setColumnCount(6)
-        self.files_table.setHorizontalHeaderLabels(["选择", "文件名", "状态", "密码", "备注", "新文件名"])
+        # 按文件名筛选显示的行（只影响显示，全选和处理仍针对全部文件）
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("筛选:"))
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("输入文件名关键字，为空则显示全部文件")
+        filter_layout.addWidget(self.filter_edit)
+        files_layout.addLayout(filter_layout)
+        
+        self.files_model = FileTableModel(self)
+        self.files_proxy = QSortFilterProxyModel(self)
+        self.files_proxy.setSourceModel(self.files_model)
+        self.files_proxy.setFilterKeyColumn(FileTableModel.COL_FILENAME)
+        self.files_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.apply_file_filter)
+        self.filter_edit.textChanged.connect(lambda text: self.filter_timer.start())
+        
+        self.files_table = QTableView()
+        self.files_table.setModel(self.files_proxy)
         self.files_table.horizontalHeader().setStretchLastSection(True)
         
         # 设置列宽
@@ -436,7 +1247,7 @@ class ExcelProtectorGUI(QMainWindow):
         # 按钮区域
         table_buttons_layout = QHBoxLayout()
         self.refresh_button = QPushButton("刷新文件列表")
-        self.refresh_button.clicked.connect(self.scan_files)
+        self.refresh_button.clicked.connect(self.refresh_files)
         table_buttons_layout.addWidget(self.refresh_button)
         
         self.select_all_check = QCheckBox("全选")
@@ -467,8 +1278,18 @@ class ExcelProtectorGUI(QMainWindow):
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMaximumHeight(150)
+        # 每条日志占一个文本块，超出上限时自动丢弃最早的行
+        self.log_text.setUndoRedoEnabled(False)
+        self.log_text.document().setMaximumBlockCount(LOG_MAX_LINES)
         progress_layout.addWidget(self.log_text)
         
+        # 新日志先写入缓冲区，由定时器定期追加到界面
+        self.log_buffer = collections.deque(maxlen=LOG_MAX_LINES)
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start()
+        
         progress_group.setLayout(progress_layout)
         main_layout.addWidget(progress_group)
         
@@ -505,6 +1326,14 @@ class ExcelProtectorGUI(QMainWindow):
         # 初始化示例后缀
         self.on_function_changed()
         
+        # 监视输入文件夹，文件增删后合并短时间内的多次通知再增量刷新
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.setInterval(300)
+        self.rescan_timer.timeout.connect(self.incremental_rescan)
+        self.fs_watcher = QFileSystemWatcher(self)
+        self.fs_watcher.directoryChanged.connect(lambda path: self.rescan_timer.start())
+        
         # 初始化文件列表
         QTimer.singleShot(100, self.scan_files)
     
@@ -563,46 +1392,49 @@ class ExcelProtectorGUI(QMainWindow):
             return
             
         try:
-            self.password_dict = {}
-            row_count = 0
-            
-            # 支持的编码列表
-            encodings = ['utf-8-sig', 'utf-8', 'gbk', 'gb2312', 'latin1', 'cp936']
+            # 一次读入，按BOM或候选编码在内存中解码
+            with open(password_book_path, 'rb') as f:
+                raw = f.read()
             
-            for encoding in encodings:
-                try:
-                    with open(password_book_path, 'r', encoding=encoding, newline='') as f:
-                        # 读取第一行判断分隔符
-                        first_line = f.readline()
-                        f.seek(0)
-                        
-                        delimiter = '\t' if '\t' in first_line else ','
-                        reader = csv.reader(f, delimiter=delimiter)
-                        
-                        for row in reader:
-                            # 跳过空行和注释行
-                            if not row or (len(row) > 0 and str(row[0]).strip().startswith('#')):
-                                continue
-                                
-                            if len(row) >= 2:
-                                filename = str(row[0]).strip()
-                                password = str(row[1]).strip()
-                                
-                                if filename:
-                                    self.password_dict[filename] = password
-                                    row_count += 1
-                        
-                    self.log_message(f"使用编码 {encoding} 读取成功，共 {row_count} 条记录", "success")
-                    break
-                        
-                except UnicodeDecodeError:
-                    continue
-                except Exception as e:
-                    self.log_message(f"编码 {encoding} 读取失败: {str(e)}", "warning")
-                    continue
+            if raw.startswith(b'\xef\xbb\xbf'):
+                encoding = 'utf-8-sig'
+                text = raw.decode(encoding, errors='replace')
+            elif raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+                encoding = 'utf-16'
+                text = raw.decode(encoding, errors='replace')
             else:
-                raise Exception("无法解码CSV文件，请检查文件编码或格式")
-                    
+                # gbk 与 gb2312/cp936 兼容，latin1 可解码任意字节，循环总会得到结果
+                for encoding in ('utf-8', 'gbk', 'latin1'):
+                    try:
+                        text = raw.decode(encoding)
+                        break
+                    except UnicodeDecodeError:
+                        continue
+            
+            # 根据第一行判断分隔符
+            first_line = text.split('\n', 1)[0]
+            delimiter = '\t' if '\t' in first_line else ','
+            reader = csv.reader(io.StringIO(text, newline=''), delimiter=delimiter)
+            
+            # 跳过空行、注释行和文件名为空的行
+            password_dict = {
+                row[0].strip(): row[1].strip()
+                for row in reader
+                if len(row) >= 2 and row[0].strip() and not row[0].strip().startswith('#')
+            }
+            
+            # 忽略大小写的查找索引，以及未写扩展名的条目组成的次级索引；只在重新加载密码本时重建
+            # （写了扩展名的条目只精确匹配，budget.xls 不会匹配到 budget.xlsx）
+            password_index = {k.casefold(): v for k, v in password_dict.items()}
+            password_stem_index = {k: v for k, v in password_index.items()
+                                   if not k.endswith(EXCEL_EXTENSIONS)}
+            
+            # 解析全部成功后再一起替换，失败时保留上一次的密码本和索引
+            self.password_dict = password_dict
+            self.password_index = password_index
+            self.password_stem_index = password_stem_index
+            self.log_message(f"使用编码 {encoding} 读取成功，共 {len(self.password_dict)} 条记录", "success")
+            
             # 自动匹配密码
             if self.auto_match_check.isChecked():
                 match_count = self.match_passwords_from_book()
@@ -613,26 +1445,34 @@ class ExcelProtectorGUI(QMainWindow):
             QMessageBox.critical(self, "错误", 
                 f"加载密码本失败:\n{str(e)}\n\n请确保CSV文件格式正确：\n1. 使用UTF-8或GBK编码\n2. 第一列是文件名，第二列是密码\n3. 使用逗号或制表符分隔")
     
-    def match_passwords_from_book(self):
-        """从密码本自动匹配密码"""
-        match_count = 0
-        for row in range(self.files_table.rowCount()):
-            filename_item = self.files_table.item(row, 1)
-            if filename_item:
-                filename = filename_item.text()
-                if filename in self.password_dict:
-                    password = self.password_dict[filename]
-                    password_item = QTableWidgetItem(password)
-                    self.files_table.setItem(row, 3, password_item)
-                    
-                    notes_item = QTableWidgetItem("来自密码本")
-                    notes_item.setForeground(QColor("blue"))
-                    self.files_table.setItem(row, 4, notes_item)
-                    
-                    match_count += 1
+    def match_passwords_from_book(self, first_row=0):
+        """从密码本自动匹配密码（只匹配 first_row 及之后的行）"""
+        model = self.files_model
+        if not self.password_index:
+            return 0
+        
+        found = [self.lookup_password(filename) if row >= first_row else None
+                 for row, filename in enumerate(model.filenames)]
+        match_count = len(found) - found.count(None)
+        if not match_count:
+            return 0
+        
+        notes_color = FileTableModel.COLOR_FROM_BOOK
+        model.passwords = [pw if hit is None else hit for pw, hit in zip(model.passwords, found)]
+        model.notes = [note if hit is None else "来自密码本" for note, hit in zip(model.notes, found)]
+        model.note_colors = [color if hit is None else notes_color for color, hit in zip(model.note_colors, found)]
+        model.columns_changed(FileTableModel.COL_PASSWORD, FileTableModel.COL_NOTES)
         
         return match_count
     
+    def lookup_password(self, filename):
+        """在密码本中查找文件密码（忽略大小写，找不到时按去掉扩展名的文件名匹配未写扩展名的条目），未找到返回None"""
+        key = filename.casefold()
+        password = self.password_index.get(key)
+        if password is None:
+            password = self.password_stem_index.get(os.path.splitext(key)[0])
+        return password
+    
     def export_password_template(self):
         """导出密码本模板"""
         file_path, _ = QFileDialog.getSaveFileName(
@@ -671,19 +1511,15 @@ class ExcelProtectorGUI(QMainWindow):
         if self.auto_match_check.isChecked():
             return
             
-        updated_count = 0
-        for row in range(self.files_table.rowCount()):
-            widget = self.files_table.cellWidget(row, 0)
-            if widget:
-                checkbox = widget.layout().itemAt(0).widget()
-                if checkbox.isChecked():
-                    password_item = QTableWidgetItem(text)
-                    self.files_table.setItem(row, 3, password_item)
-                    
-                    notes_item = QTableWidgetItem("统一密码")
-                    notes_item.setForeground(QColor("green"))
-                    self.files_table.setItem(row, 4, notes_item)
-                    updated_count += 1
+        # 按选择掩码整列赋值
+        model = self.files_model
+        mask = model.selected
+        notes_color = FileTableModel.COLOR_UNIFIED
+        model.passwords = [text if sel else pw for pw, sel in zip(model.passwords, mask)]
+        model.notes = ["统一密码" if sel else note for note, sel in zip(model.notes, mask)]
+        model.note_colors = [notes_color if sel else color for color, sel in zip(model.note_colors, mask)]
+        model.columns_changed(FileTableModel.COL_PASSWORD, FileTableModel.COL_NOTES)
+        updated_count = sum(mask)
         
         if updated_count > 0:
             self.log_message(f"已为 {updated_count} 个选中文件更新统一密码", "info")
@@ -695,7 +1531,11 @@ class ExcelProtectorGUI(QMainWindow):
         else:
             self.single_password_edit.setEchoMode(QLineEdit.Password)
     
-    def scan_files(self):
+    def refresh_files(self):
+        """刷新文件列表（忽略缓存，重新扫描文件夹）"""
+        self.scan_files(use_cache=False)
+    
+    def scan_files(self, use_cache=True):
         """扫描文件夹中的Excel文件"""
         folder_path = self.input_folder_edit.text()
         if not os.path.exists(folder_path):
@@ -711,76 +1551,82 @@ class ExcelProtectorGUI(QMainWindow):
             except Exception as e:
                 self.log_message(f"创建输出文件夹失败: {str(e)}", "error")
         
-        # 清空表格
-        self.files_table.setRowCount(0)
-        
-        # 扫描Excel文件
-        excel_files = []
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith(('.xlsx', '.xls', '.xlsm', '.xlsb')):
-                if not filename.startswith('~$') and not filename.startswith('~'):
-                    excel_files.append(filename)
+        # 扫描Excel文件（文件夹未变化时使用缓存），并监视文件夹后续的变化
+        excel_files = list_excel_files_cached(folder_path, use_cache)
+        self.scanned_folder = folder_path
+        self.watch_input_folder(folder_path)
         
         if not excel_files:
             self.log_message(f"警告：在文件夹 {folder_path} 中未找到Excel文件", "warning")
             QMessageBox.warning(self, "提示", 
                 f"在文件夹中未找到Excel文件：\n{folder_path}\n\n请检查：\n1. 文件夹路径是否正确\n2. 文件夹中是否有Excel文件（.xlsx, .xls）")
         
-        # 更新表格
-        for filename in excel_files:
-            row = self.files_table.rowCount()
-            self.files_table.insertRow(row)
-            
-            # 选择复选框
-            checkbox = QCheckBox()
-            checkbox.setChecked(True)
-            checkbox_widget = QWidget()
-            checkbox_layout = QHBoxLayout(checkbox_widget)
-            checkbox_layout.addWidget(checkbox)
-            checkbox_layout.setAlignment(Qt.AlignCenter)
-            checkbox_layout.setContentsMargins(0, 0, 0, 0)
-            self.files_table.setCellWidget(row, 0, checkbox_widget)
-            
-            # 文件名
-            filename_item = QTableWidgetItem(filename)
-            self.files_table.setItem(row, 1, filename_item)
-            
-            # 状态
-            status_item = QTableWidgetItem("待处理")
-            status_item.setForeground(QColor("gray"))
-            self.files_table.setItem(row, 2, status_item)
-            
-            # 密码（初始为空）
-            password_item = QTableWidgetItem("")
-            self.files_table.setItem(row, 3, password_item)
+        # 更新表格：重置、匹配密码、预览文件名只重绘一次
+        self.files_table.setUpdatesEnabled(False)
+        try:
+            self.files_model.set_files(excel_files)
             
-            # 备注
-            notes_item = QTableWidgetItem("")
-            self.files_table.setItem(row, 4, notes_item)
+            self.status_bar.showMessage(f"找到 {len(excel_files)} 个Excel文件")
+            self.log_message(f"扫描完成，找到 {len(excel_files)} 个Excel文件", "success")
             
-            # 新文件名
-            new_filename_item = QTableWidgetItem("")
-            self.files_table.setItem(row, 5, new_filename_item)
+            # 如果密码本已加载且启用了自动匹配，进行匹配
+            if self.password_dict and self.auto_match_check.isChecked():
+                match_count = self.match_passwords_from_book()
+                if match_count > 0:
+                    self.log_message(f"自动匹配完成，成功匹配 {match_count} 个文件", "success")
+        finally:
+            self.files_table.setUpdatesEnabled(True)
+    
+    def watch_input_folder(self, folder_path):
+        """监视输入文件夹的变化"""
+        watched = self.fs_watcher.directories()
+        if watched == [folder_path]:
+            return
+        if watched:
+            self.fs_watcher.removePaths(watched)
+        self.fs_watcher.addPath(folder_path)
+    
+    def incremental_rescan(self):
+        """输入文件夹内容变化时，只增删有变化的行"""
+        folder_path = self.scanned_folder
+        if not folder_path or not os.path.isdir(folder_path):
+            return
         
-        self.status_bar.showMessage(f"找到 {len(excel_files)} 个Excel文件")
-        self.log_message(f"扫描完成，找到 {len(excel_files)} 个Excel文件", "success")
+        # 处理过程中不改动表格，完成后再刷新
+        if self.is_processing:
+            self.rescan_pending = True
+            return
+        self.rescan_pending = False
+        
+        model = self.files_model
+        new_set = set(list_excel_files(folder_path))
+        old_set = set(model.filenames)
+        added = sorted(new_set - old_set)
+        removed = old_set - new_set
+        if not added and not removed:
+            return
         
-        # 如果密码本已加载且启用了自动匹配，进行匹配
-        if self.password_dict and self.auto_match_check.isChecked():
-            match_count = self.match_passwords_from_book()
-            if match_count > 0:
-                self.log_message(f"自动匹配完成，成功匹配 {match_count} 个文件", "success")
+        self.files_table.setUpdatesEnabled(False)
+        try:
+            model.remove_files(removed)
+            first_row = model.rowCount()
+            model.append_files(added)
+            
+            if added and self.password_dict and self.auto_match_check.isChecked():
+                self.match_passwords_from_book(first_row)
+        finally:
+            self.files_table.setUpdatesEnabled(True)
         
-        # 预览新文件名
-        self.preview_new_filenames()
+        self.status_bar.showMessage(f"找到 {model.rowCount()} 个Excel文件")
+        self.log_message(f"文件夹内容变化：新增 {len(added)} 个，移除 {len(removed)} 个文件", "info")
+    
+    def apply_file_filter(self):
+        """按输入的关键字筛选显示的文件"""
+        self.files_proxy.setFilterFixedString(self.filter_edit.text().strip())
     
     def select_all_files(self, state):
         """全选/取消全选文件"""
-        for row in range(self.files_table.rowCount()):
-            widget = self.files_table.cellWidget(row, 0)
-            if widget:
-                checkbox = widget.layout().itemAt(0).widget()
-                checkbox.setChecked(state == Qt.Checked)
+        self.files_model.set_all_selected(state == Qt.Checked)
     
     def update_selected_passwords(self):
         """更新选中文件的密码"""
@@ -792,30 +1638,36 @@ class ExcelProtectorGUI(QMainWindow):
         )
         
         if ok and password:
+            model = self.files_model
+            notes_color = FileTableModel.COLOR_MANUAL
+            rows = [row for row, selected in enumerate(model.selected) if selected]
+            processed_rows = [row for row in rows if model.statuses[row] != FileTableModel.STATUS_PENDING]
+            
+            # 已处理过的文件汇总后只确认一次
+            if processed_rows:
+                file_list = "\n".join(model.filenames[row] for row in processed_rows[:10])
+                if len(processed_rows) > 10:
+                    file_list += f"\n...等 {len(processed_rows)} 个文件"
+                reply = QMessageBox.question(
+                    self,
+                    "确认覆盖",
+                    f"以下文件已经处理过，是否重新设置密码？\n{file_list}\n\n"
+                    "选择“否”将只为未处理的文件设置密码。",
+                    QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+                )
+                if reply == QMessageBox.Cancel:
+                    return
+                if reply != QMessageBox.Yes:
+                    rows = [row for row in rows if model.statuses[row] == FileTableModel.STATUS_PENDING]
+            
             updated_count = 0
-            for row in range(self.files_table.rowCount()):
-                widget = self.files_table.cellWidget(row, 0)
-                if widget:
-                    checkbox = widget.layout().itemAt(0).widget()
-                    if checkbox.isChecked():
-                        status_item = self.files_table.item(row, 2)
-                        if status_item and status_item.text() != "待处理":
-                            reply = QMessageBox.question(
-                                self,
-                                "确认覆盖",
-                                f"文件 {self.files_table.item(row, 1).text()} 已经处理过，是否重新设置密码？",
-                                QMessageBox.Yes | QMessageBox.No
-                            )
-                            if reply != QMessageBox.Yes:
-                                continue
-                        
-                        password_item = QTableWidgetItem(password)
-                        self.files_table.setItem(row, 3, password_item)
-                        
-                        notes_item = QTableWidgetItem("手动设置")
-                        notes_item.setForeground(QColor("orange"))
-                        self.files_table.setItem(row, 4, notes_item)
-                        updated_count += 1
+            for row in rows:
+                model.passwords[row] = password
+                model.notes[row] = "手动设置"
+                model.note_colors[row] = notes_color
+                updated_count += 1
+            
+            model.columns_changed(FileTableModel.COL_PASSWORD, FileTableModel.COL_NOTES)
             
             if updated_count > 0:
                 self.log_message(f"已为 {updated_count} 个选中文件设置密码: {password}", "success")
@@ -824,49 +1676,19 @@ class ExcelProtectorGUI(QMainWindow):
     
     def preview_new_filenames(self):
         """预览新文件名"""
-        suffix = self.suffix_edit.text().strip()
-        
-        for row in range(self.files_table.rowCount()):
-            filename_item = self.files_table.item(row, 1)
-            if filename_item:
-                filename = filename_item.text()
-                name, ext = os.path.splitext(filename)
-                
-                if suffix:
-                    new_filename = f"{name}{suffix}{ext}"
-                else:
-                    new_filename = filename
-                    
-                new_filename_item = QTableWidgetItem(new_filename)
-                self.files_table.setItem(row, 5, new_filename_item)
-    
-    def get_selected_files(self):
-        """获取选中的文件及其信息"""
-        selected_files = []
-        for row in range(self.files_table.rowCount()):
-            widget = self.files_table.cellWidget(row, 0)
-            if widget:
-                checkbox = widget.layout().itemAt(0).widget()
-                if checkbox.isChecked():
-                    filename = self.files_table.item(row, 1).text()
-                    password_item = self.files_table.item(row, 3)
-                    password = password_item.text() if password_item else ""
-                    notes_item = self.files_table.item(row, 4)
-                    notes = notes_item.text() if notes_item else ""
-                    new_filename_item = self.files_table.item(row, 5)
-                    new_filename = new_filename_item.text() if new_filename_item else filename
-                    
-                    selected_files.append({
-                        'filename': filename,
-                        'new_filename': new_filename,
-                        'password': password,
-                        'notes': notes
-                    })
-        return selected_files
-    
-    def validate_selection(self):
+        self.suffix_timer.stop()
+        self.files_model.set_suffix(self.suffix_edit.text().strip())
+    
+    def iter_selected_files(self):
+        """逐个生成选中的文件及其信息"""
+        model = self.files_model
+        for row, (filename, selected, password, notes) in enumerate(zip(
+                model.filenames, model.selected, model.passwords, model.notes)):
+            if selected:
+                yield SelectedFile(filename, model.new_filename(row), password, notes)
+    
+    def validate_selection(self, selected_files):
         """验证选择的有效性"""
-        selected_files = self.get_selected_files()
         if not selected_files:
             return False, "请至少选择一个文件！"
         
@@ -882,15 +1704,19 @@ class ExcelProtectorGUI(QMainWindow):
         
         # 检查加密模式下的密码
         if self.encrypt_radio.isChecked():
+            # 只保留前5个文件名用于提示，其余只计数
             empty_password_files = []
+            empty_count = 0
             for file_info in selected_files:
-                if not file_info['password']:
-                    empty_password_files.append(file_info['filename'])
+                if not file_info.password:
+                    empty_count += 1
+                    if empty_count <= 5:
+                        empty_password_files.append(file_info.filename)
             
-            if empty_password_files:
-                file_list = "\n".join(empty_password_files[:5])
-                if len(empty_password_files) > 5:
-                    file_list += f"\n...等 {len(empty_password_files)} 个文件"
+            if empty_count:
+                file_list = "\n".join(empty_password_files)
+                if empty_count > 5:
+                    file_list += f"\n...等 {empty_count} 个文件"
                 return False, f"以下文件没有设置密码：\n{file_list}"
         
         return True, ""
@@ -903,19 +1729,21 @@ class ExcelProtectorGUI(QMainWindow):
         
         # 验证输入
         input_path = self.input_folder_edit.text()
-        print(input_path)
         if not os.path.exists(input_path):
             QMessageBox.warning(self, "警告", "请选择有效的输入文件夹！")
             return
         
-        # 验证选择
-        is_valid, error_msg = self.validate_selection()
+        # 后缀刚修改、新文件名还未刷新时先刷新
+        if self.suffix_timer.isActive():
+            self.preview_new_filenames()
+        
+        # 获取选中的文件（只遍历一次表格），并验证选择
+        selected_files = list(self.iter_selected_files())
+        is_valid, error_msg = self.validate_selection(selected_files)
         if not is_valid:
             QMessageBox.warning(self, "警告", error_msg)
             return
         
-        # 获取选中的文件
-        selected_files = self.get_selected_files()
         output_path = self.output_folder_edit.text()
         suffix = self.suffix_edit.text().strip()
         
@@ -950,21 +1778,49 @@ class ExcelProtectorGUI(QMainWindow):
         self.is_cancelled = False
         self.is_processing = True
         
-        # 创建处理线程
+        # 创建处理线程（复用常驻的工作进程池）
+        pool, cancel_event = self.acquire_worker_pool()
+        cancel_event.clear()
         self.process_thread = ProcessingThread(
             input_path,
             output_path,
             selected_files,
             self.encrypt_radio.isChecked(),
+            pool,
+            cancel_event,
             self
         )
         self.process_thread.progress_signal.connect(self.update_progress)
         self.process_thread.log_signal.connect(self.log_message)
-        self.process_thread.file_status_signal.connect(self.update_file_status)
+        self.process_thread.batch_status_signal.connect(self.on_batch_status)
         self.process_thread.finished_signal.connect(self.processing_finished)
         
         self.process_thread.start()
     
+    def acquire_worker_pool(self):
+        """获取工作进程池，首次使用时创建，之后各批次复用（Excel实例保持运行）"""
+        if self.worker_pool is None:
+            self.cancel_event = multiprocessing.Event()
+            processes = max(1, min(MAX_WORKERS, os.cpu_count() or 1))
+            self.worker_pool = multiprocessing.Pool(
+                processes=processes,
+                initializer=_worker_init,
+                initargs=(self.cancel_event,)
+            )
+        return self.worker_pool, self.cancel_event
+    
+    def shutdown_worker_pool(self):
+        """关闭工作进程池，各进程退出时关闭自己的Excel"""
+        if self.worker_pool is None:
+            return
+        
+        try:
+            self.worker_pool.close()
+            self.worker_pool.join()
+        except:
+            pass
+        self.worker_pool = None
+    
     def cancel_processing(self):
         """取消处理"""
         if not self.is_processing:
@@ -1000,21 +1856,11 @@ class ExcelProtectorGUI(QMainWindow):
         self.preview_button.setEnabled(enabled)
         self.start_button.setEnabled(enabled)
         self.clear_log_button.setEnabled(enabled)
-        self.export_log_button.setEnabled(enabled)
+        self.export_log_button.setEnabled(enabled and self.log_export_task is None)
         self.cancel_button.setEnabled(not enabled)
         
         # 禁用/启用表格编辑
-        for row in range(self.files_table.rowCount()):
-            password_item = self.files_table.item(row, 3)
-            if password_item:
-                if enabled:
-                    status_item = self.files_table.item(row, 2)
-                    if status_item and status_item.text() == "待处理":
-                        password_item.setFlags(password_item.flags() | Qt.ItemIsEditable)
-                    else:
-                        password_item.setFlags(password_item.flags() & ~Qt.ItemIsEditable)
-                else:
-                    password_item.setFlags(password_item.flags() & ~Qt.ItemIsEditable)
+        self.files_model.set_locked(not enabled)
     
     def update_progress(self, value, maximum=None):
         """更新进度条"""
@@ -1024,51 +1870,64 @@ class ExcelProtectorGUI(QMainWindow):
     
     def log_message(self, message, message_type="info"):
         """添加日志消息"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        
-        if message_type == "error":
-            color = "#ff4444"
-            prefix = "[错误]"
-        elif message_type == "warning":
-            color = "#ff9900"
-            prefix = "[警告]"
-        elif message_type == "success":
-            color = "#44aa44"
-            prefix = "[成功]"
-        else:
-            color = "#666666"
-            prefix = "[信息]"
+        prefix = self.LOG_PREFIXES.get(message_type, self.LOG_PREFIXES["info"])
+        log_entry = LOG_ENTRY_TEMPLATE.format(time.strftime("%H:%M:%S"), prefix, message)
+        self.log_buffer.append(log_entry)
+    
+    def flush_log(self):
+        """把缓冲区中的日志刷新到界面"""
+        if not self.log_buffer:
+            return
         
-        log_entry = f'<font color="#888888">{timestamp}</font> <font color="{color}">{prefix}</font> {message}'
-        self.log_text.append(log_entry)
+        # 只追加尚未显示的日志，已有内容不重新排版
+        cursor = QTextCursor(self.log_text.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        first_block = self.log_text.document().isEmpty()
+        for log_entry in self.log_buffer:
+            if not first_block:
+                cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+            first_block = False
+            cursor.insertHtml(log_entry)
+        cursor.endEditBlock()
+        self.log_buffer.clear()
         
         # 自动滚动到底部
+        self.log_text.moveCursor(QTextCursor.End)
         scrollbar = self.log_text.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
     
+    def on_batch_status(self, status_list):
+        """批量更新文件状态和日志"""
+        self.files_table.setUpdatesEnabled(False)
+        try:
+            for filename, status, is_success, notes, log_text in status_list:
+                self.update_file_status(filename, status, is_success, notes)
+                self.log_message(log_text, "success" if is_success else "error")
+        finally:
+            self.files_table.setUpdatesEnabled(True)
+    
     def update_file_status(self, filename, status, is_success=True, notes=""):
         """更新文件状态"""
-        for row in range(self.files_table.rowCount()):
-            if self.files_table.item(row, 1).text() == filename:
-                # 更新状态
-                status_item = QTableWidgetItem(status)
-                if is_success:
-                    status_item.setForeground(QColor("#44aa44"))
-                else:
-                    status_item.setForeground(QColor("#ff4444"))
-                self.files_table.setItem(row, 2, status_item)
-                
-                # 更新备注
-                if notes:
-                    notes_item = QTableWidgetItem(notes)
-                    self.files_table.setItem(row, 4, notes_item)
-                
-                # 处理完成后禁用密码编辑
-                password_item = self.files_table.item(row, 3)
-                if password_item:
-                    password_item.setFlags(password_item.flags() & ~Qt.ItemIsEditable)
-                
-                break
+        model = self.files_model
+        row = model.row_by_filename.get(filename)
+        if row is None:
+            return
+        
+        # 更新状态
+        model.statuses[row] = status
+        if is_success:
+            model.status_colors[row] = FileTableModel.COLOR_SUCCESS
+        else:
+            model.status_colors[row] = FileTableModel.COLOR_FAILED
+        
+        # 更新备注
+        if notes:
+            model.notes[row] = notes
+            model.note_colors[row] = None
+        
+        # 状态不再是待处理，flags() 随之禁用密码编辑
+        model.row_changed(row)
     
     def processing_finished(self, results):
         """处理完成"""
@@ -1077,6 +1936,10 @@ class ExcelProtectorGUI(QMainWindow):
         
         self.set_controls_enabled(True)
         
+        # 处理期间文件夹有变化，补做增量刷新
+        if self.rescan_pending:
+            self.incremental_rescan()
+        
         # 显示完成消息
         self.log_message(f"处理完成！成功：{success_count}/{total_count}", "success")
         self.status_bar.showMessage(f"处理完成 - 成功：{success_count}/{total_count}")
@@ -1095,6 +1958,7 @@ class ExcelProtectorGUI(QMainWindow):
     
     def clear_log(self):
         """清空日志"""
+        self.log_buffer.clear()
         self.log_text.clear()
     
     def export_log(self):
@@ -1107,12 +1971,27 @@ class ExcelProtectorGUI(QMainWindow):
         )
         
         if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.log_text.toPlainText())
-                self.log_message(f"日志已导出到：{file_path}", "success")
-            except Exception as e:
-                self.log_message(f"导出日志失败：{str(e)}", "error")
+            # 文档只能在界面线程读取，先逐块取出文本，写文件放到线程池中
+            self.flush_log()
+            lines = []
+            block = self.log_text.document().begin()
+            while block.isValid():
+                lines.append(block.text())
+                block = block.next()
+            
+            self.export_log_button.setEnabled(False)
+            self.log_export_task = LogExportTask(file_path, lines)
+            self.log_export_task.signals.finished_signal.connect(self.log_export_finished)
+            QThreadPool.globalInstance().start(self.log_export_task)
+    
+    def log_export_finished(self, file_path, error):
+        """导出日志完成"""
+        self.log_export_task = None
+        self.export_log_button.setEnabled(not self.is_processing)
+        if error:
+            self.log_message(f"导出日志失败：{error}", "error")
+        else:
+            self.log_message(f"日志已导出到：{file_path}", "success")
     
     def closeEvent(self, event):
         """关闭窗口事件"""
@@ -1125,10 +2004,12 @@ class ExcelProtectorGUI(QMainWindow):
             )
             if reply == QMessageBox.Yes:
                 self.cancel_processing()
+                self.shutdown_worker_pool()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.shutdown_worker_pool()
             event.accept()
 
 
@@ -1149,4 +2030,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file